@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Load-test runner — يشغّل redis-server محلي + simulator.py + main.py لكل سيناريو
+(عدد أسواق × فترة poll) ويقيس الإنتاجية والتأخر واستهلاك الموارد.
+
+مثال:
+  python loadtest.py --markets 100,500,1000,2000 --poll 3,1 --duration 60
+  python loadtest.py --markets 1000 --poll 1 --latency-ms 150 --error-rate 0.05 --rate-limit 20
+
+يتطلب redis-server في PATH وLinux (/proc) لقياس CPU/RSS.
+"""
+
+import os, sys, time, json, signal, socket, argparse, subprocess
+import requests
+import redis
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# ========= Helpers =========
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_http(url, timeout=20.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            if requests.get(url, timeout=1.0).status_code == 200:
+                return True
+        except Exception:
+            pass
+        time.sleep(0.2)
+    return False
+
+def wait_redis(client, timeout=10.0):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            return client.ping()
+        except Exception:
+            time.sleep(0.1)
+    return False
+
+def proc_usage(pid):
+    """(cpu_seconds, rss_mb) من /proc؛ (None, None) إذا غير متاح."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLK_TCK   # utime + stime
+        with open(f"/proc/{pid}/status") as f:
+            rss = next((int(l.split()[1]) for l in f if l.startswith("VmRSS:")), 0) / 1024.0
+        return cpu, rss
+    except Exception:
+        return None, None
+
+def get_json(url):
+    """GET اختياري: None بدل رفع استثناء حتى لا نخسر بقية المقاييس."""
+    try:
+        return requests.get(url, timeout=5).json()
+    except Exception as e:
+        print(f"[LOAD][WARN] {url}: {type(e).__name__}: {e}")
+        return None
+
+def redis_used_mb(client):
+    try:
+        return round(client.info("memory").get("used_memory", 0) / 1024.0 / 1024.0, 1)
+    except Exception as e:
+        print(f"[LOAD][WARN] redis INFO: {type(e).__name__}: {e}")
+        return None
+
+def spawn(cmd, env, log_path):
+    # الابن يحتفظ بنسخته من الـ fd؛ نغلق نسخة الأب فورًا حتى لا تتسرب عبر السيناريوهات
+    with open(log_path, "w") as log:
+        return subprocess.Popen(cmd, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+
+def stop(proc):
+    if proc is None or proc.poll() is not None: return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=5)
+    except Exception:
+        try: os.killpg(proc.pid, signal.SIGKILL)
+        except Exception: pass
+
+# ========= سيناريو واحد =========
+def run_scenario(args, n_markets, poll_sec, log_dir):
+    redis_port, sim_port, app_port = free_port(), free_port(), free_port()
+    tag = f"m{n_markets}_p{poll_sec}"
+    base_env = dict(os.environ)
+    procs = []
+    try:
+        procs.append(spawn([args.redis_server, "--port", str(redis_port), "--save", "", "--appendonly", "no"],
+                           base_env, os.path.join(log_dir, f"{tag}_redis.log")))
+        rc = redis.Redis(port=redis_port, decode_responses=True)
+        if not wait_redis(rc):
+            raise RuntimeError("redis-server did not start")
+
+        sim_env = dict(base_env,
+                       SIM_PORT=str(sim_port), SIM_MARKETS=str(n_markets),
+                       SIM_LATENCY_MS=str(args.latency_ms), SIM_JITTER_MS=str(args.jitter_ms),
+                       SIM_ERROR_RATE=str(args.error_rate), SIM_RATE_LIMIT=str(args.rate_limit),
+                       SIM_PUMP_EVERY=str(args.pump_every))
+        procs.append(spawn([sys.executable, "simulator.py"], sim_env, os.path.join(log_dir, f"{tag}_sim.log")))
+        sim_url = f"http://127.0.0.1:{sim_port}"
+        if not wait_http(f"{sim_url}/"):
+            raise RuntimeError("simulator did not start")
+
+        app_env = dict(base_env,
+                       BITVAVO_URL=f"{sim_url}/v2", REDIS_URL=f"redis://127.0.0.1:{redis_port}/0",
+                       POLL_SEC=str(poll_sec), BOT_TOKEN="", CHAT_ID="",
+                       STRATEGIES=args.strategies)
+        app_proc = spawn([sys.executable, "-c",
+                          f"import main; main.app.run(host='127.0.0.1', port={app_port}, threaded=True)"],
+                         app_env, os.path.join(log_dir, f"{tag}_app.log"))
+        procs.append(app_proc)
+        app_url = f"http://127.0.0.1:{app_port}"
+        if not wait_http(f"{app_url}/"):
+            raise RuntimeError("app did not start")
+
+        time.sleep(args.warmup)
+        s0 = get_json(f"{sim_url}/sim/stats")
+        cpu0, _ = proc_usage(app_proc.pid)
+        t0 = time.time()
+
+        ages, rss_peak = [], 0.0
+        while time.time() - t0 < args.duration:
+            time.sleep(1.0)
+            try:
+                st = requests.get(f"{app_url}/stats", timeout=5).json()
+                if st.get("last_bulk_age") is not None:
+                    ages.append(st["last_bulk_age"])
+            except Exception:
+                ages.append(None)
+            _, rss = proc_usage(app_proc.pid)
+            rss_peak = max(rss_peak, rss or 0.0)
+
+        elapsed = time.time() - t0
+        s1 = get_json(f"{sim_url}/sim/stats")
+        cpu1, _ = proc_usage(app_proc.pid)
+        sim_ok = bool(s0 and s1)
+        s1 = s1 or {}
+
+        def rate(ep):
+            if not sim_ok: return None
+            return round((s1["requests"].get(ep, 0) - s0["requests"].get(ep, 0)) / elapsed, 3)
+
+        def status_delta(code):
+            if not sim_ok: return None
+            return int(s1["status"].get(code, 0)) - int(s0["status"].get(code, 0))
+
+        ok_ages = [a for a in ages if a is not None]
+        return {
+            "markets": n_markets, "poll_sec": poll_sec,
+            "target_tps": round(1.0 / poll_sec, 3),
+            "ticker_tps": rate("/ticker/price"),
+            "book_rps": rate("/book"),
+            "candles_rps": rate("/candles"),
+            "tick_gap_p95": s1.get("ticker_gap_p95") and round(s1["ticker_gap_p95"], 3),
+            "tick_gap_max": s1.get("ticker_gap_max") and round(s1["ticker_gap_max"], 3),
+            "bulk_age_avg": round(sum(ok_ages) / len(ok_ages), 2) if ok_ages else None,
+            "bulk_age_max": max(ok_ages) if ok_ages else None,
+            "stats_timeouts": len(ages) - len(ok_ages),
+            "http_429": status_delta("429"),
+            "http_500": status_delta("500"),
+            "cpu_pct": round((cpu1 - cpu0) / elapsed * 100.0, 1) if cpu0 is not None and cpu1 is not None else None,
+            "rss_peak_mb": round(rss_peak, 1),
+            "redis_mb": redis_used_mb(rc),
+        }
+    finally:
+        for p in reversed(procs):
+            stop(p)
+
+# ========= تقرير =========
+COLS = ["markets", "poll_sec", "target_tps", "ticker_tps", "tick_gap_p95", "tick_gap_max",
+        "bulk_age_avg", "bulk_age_max", "book_rps", "candles_rps", "http_429", "http_500",
+        "cpu_pct", "rss_peak_mb", "redis_mb"]
+
+def print_table(rows):
+    if not rows:
+        print("[LOAD] no scenarios run"); return
+    widths = {c: max(len(c), *(len(str(r.get(c))) for r in rows)) for c in COLS}
+    print("  ".join(c.rjust(widths[c]) for c in COLS))
+    for r in rows:
+        print("  ".join(str(r.get(c)).rjust(widths[c]) for c in COLS))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--markets", default="100,500,1000", help="قائمة أعداد الأسواق")
+    ap.add_argument("--poll", default="3,1", help="قائمة POLL_SEC (ثوانٍ صحيحة)")
+    ap.add_argument("--duration", type=float, default=60.0, help="مدة القياس لكل سيناريو (ث)")
+    ap.add_argument("--warmup", type=float, default=10.0, help="إحماء قبل القياس (ث)")
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="طلب/ثانية قبل 429 (0 = بلا حد)")
+    ap.add_argument("--pump-every", type=float, default=30.0, help="قفزة تلقائية كل N ثانية (0 = معطّل)")
+    ap.add_argument("--strategies", default=os.getenv("STRATEGIES", ""), help="STRATEGIES JSON للتطبيق")
+    ap.add_argument("--redis-server", default="redis-server")
+    ap.add_argument("--log-dir", default=os.path.join(HERE, "loadtest_logs"))
+    ap.add_argument("--json", help="حفظ النتائج في ملف JSON")
+    args = ap.parse_args()
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    rows = []
+    for n in [int(x) for x in args.markets.split(",") if x]:
+        for poll in [int(x) for x in args.poll.split(",") if x]:
+            print(f"[LOAD] markets={n} poll={poll}s duration={args.duration:.0f}s ...", flush=True)
+            try:
+                row = run_scenario(args, n, poll, args.log_dir)
+            except Exception as e:
+                print(f"[LOAD][ERR] {type(e).__name__}: {e}")
+                row = {"markets": n, "poll_sec": poll}
+            rows.append(row)
+            print(json.dumps(row, ensure_ascii=False), flush=True)
+
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
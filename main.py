@@ -33,6 +33,10 @@ POLL_SEC            = int(os.getenv("POLL_SEC", 3))
 MARKETS_REFRESH_SEC = int(os.getenv("MARKETS_REFRESH_SEC", 120))
 UNHEALTHY_THRESHOLD = int(os.getenv("UNHEALTHY_THRESHOLD", 6))
 
+# كاش قصير لـ /book و /candles (ثوانٍ) مع دمج الطلبات المتزامنة
+FEATURE_CACHE_TTL   = float(os.getenv("FEATURE_CACHE_TTL", 0.8))
+BULK_SNAPSHOT_MAX_POLLS = 3   # لقطة bulk أقدم من 3×POLL_SEC تُعتبر قديمة
+
 # ========= إعدادات التعلم =========
 LEARN_ENABLED        = os.getenv("LEARN_ENABLED", "1") == "1"
 SELECT_EVERY_SEC     = 60
@@ -62,6 +66,41 @@ DEFAULT_PARAMS = {
 # كم شرط إضافي نحتاجه فوق شرط الزخم (قابل للتعديل من env)
 REQUIRED_EXTRA_SIG = int(os.getenv("REQUIRED_EXTRA_SIG", "2"))  # بدل 3 كانت شديدة
 
+# ========= استراتيجيات ظل (تقييم حي بدون تداول) =========
+# STRATEGIES='{"tight":{"spread_max":0.25},"strict":{"required_extra":3}}'
+# كل استراتيجية: عتبات أولية خاصة + مفاتيح Redis خاصة (fl:s:<name>:...) + تكيّف وإحصاءات مستقلة.
+# "live" هي الإعداد الأصلي بمفاتيحه القديمة (fl:...) وهي الوحيدة التي ترسل تلغرام.
+def parse_strategies(raw):
+    out = [{"name": "live", "ns": "fl:", "defaults": DEFAULT_PARAMS.copy(),
+            "required_extra": REQUIRED_EXTRA_SIG}]
+    try:
+        cfg = json.loads(raw) if raw else {}
+    except Exception as e:
+        print(f"[STRAT][ERR] {type(e).__name__}: {e}")
+        cfg = {}
+    if not isinstance(cfg, dict):
+        print(f"[STRAT][ERR] STRATEGIES must be a JSON object, got {type(cfg).__name__}")
+        cfg = {}
+    for name, ov in cfg.items():
+        if name == "live" or ":" in name or not isinstance(ov, dict):
+            print(f"[STRAT] skip invalid strategy {name!r}"); continue
+        unknown = [k for k in ov if k not in DEFAULT_PARAMS and k != "required_extra"]
+        if unknown:
+            print(f"[STRAT] {name!r}: ignoring unknown keys {unknown}")
+        try:
+            defaults = DEFAULT_PARAMS.copy()
+            defaults.update({k: float(v) for k, v in ov.items() if k in DEFAULT_PARAMS})
+            required_extra = int(ov.get("required_extra", REQUIRED_EXTRA_SIG))
+        except Exception as e:
+            print(f"[STRAT] skip invalid strategy {name!r}: {type(e).__name__}: {e}"); continue
+        out.append({"name": name, "ns": f"fl:s:{name}:", "defaults": defaults,
+                    "required_extra": required_extra})
+    return out
+
+STRATEGIES = parse_strategies(os.getenv("STRATEGIES", ""))
+LIVE       = STRATEGIES[0]
+STRAT_BY_NAME = {s["name"]: s for s in STRATEGIES}
+
 # ========= حالة =========
 lock   = Lock()
 started= Event()
@@ -74,6 +113,7 @@ last_markets_refresh = 0
 
 prices_local = defaultdict(lambda: deque(maxlen=128))
 last_bulk_ts = 0
+bulk_snapshot = {}          # آخر نتيجة bulk_prices() كاملة
 consecutive_http_fail = 0
 
 watch_list = set()
@@ -224,8 +264,64 @@ def top2_for_interval(bases, interval):
     seconds = 300 if interval == "5m" else 900
     return top_from_redis(bases, seconds=seconds, topn=2, min_points=3, sample_cap=300)
 
+# ========= كاش الميزات (single-flight) =========
+# (endpoint, base) -> (ts, value). طلب واحد فقط قيد التنفيذ لكل مفتاح؛ البقية ينتظرون نتيجته.
+_fc_lock     = Lock()
+_fc_cache    = {}
+_fc_inflight = {}
+cache_stats  = defaultdict(int)   # "<endpoint>:hit|miss|shared|err"
+
+def cached_fetch(endpoint, base, fetch):
+    key = (endpoint, base)
+    with _fc_lock:
+        now = time.time()
+        ent = _fc_cache.get(key)
+        if ent and (now - ent[0]) < FEATURE_CACHE_TTL:
+            cache_stats[f"{endpoint}:hit"] += 1
+            return ent[1]
+        flight = _fc_inflight.get(key)   # [Event, نتيجة القائد]
+        leader = flight is None
+        if leader:
+            flight = _fc_inflight[key] = [Event(), None]
+            cache_stats[f"{endpoint}:miss"] += 1
+        else:
+            cache_stats[f"{endpoint}:shared"] += 1
+
+    if not leader:
+        flight[0].wait(HTTP_TIMEOUT * 5)
+        return flight[1]
+
+    val = None
+    try:
+        val = fetch(base)
+    finally:
+        with _fc_lock:
+            now = time.time()
+            flight[1] = val
+            # الفشل ({} / None / استثناء) لا يُخزَّن: المنتظرون يأخذونه، والطلب التالي يعيد المحاولة
+            if val is not None and val != {}:
+                _fc_cache[key] = (now, val)
+            else:
+                cache_stats[f"{endpoint}:err"] += 1
+            if len(_fc_cache) > 512:
+                for k in [k for k, (ts, _) in _fc_cache.items() if (now - ts) >= FEATURE_CACHE_TTL]:
+                    _fc_cache.pop(k, None)
+            _fc_inflight.pop(key, None)
+        flight[0].set()
+    return val
+
+def cache_stats_snapshot():
+    with _fc_lock:
+        return dict(cache_stats)
+
 # ========= دفتر أوامر/سبريد/حجم =========
 def get_orderbook_and_spread(base):
+    return cached_fetch("book", base, fetch_orderbook_and_spread)
+
+def vol_1m_vs_5m(base):
+    return cached_fetch("candles", base, fetch_vol_1m_vs_5m)
+
+def fetch_orderbook_and_spread(base):
     resp = http_get(f"{BASE_URL}/book", params={"market": f"{base}-{QUOTE}", "depth": ORDERBOOK_DEPTH_LVL})
     if not resp or resp.status_code != 200: return {}
     try:
@@ -248,7 +344,7 @@ def get_orderbook_and_spread(base):
     except Exception:
         return {}
 
-def vol_1m_vs_5m(base):
+def fetch_vol_1m_vs_5m(base):
     """ FIX-1: مسار صحيح لشموع Bitvavo. """
     resp = http_get(f"{BASE_URL}/candles", params={"market": f"{base}-{QUOTE}", "interval": "1m"})
     if not resp or resp.status_code != 200: return None
@@ -266,52 +362,80 @@ def get_last_price(base):
     p = redis_last_price(base)
     if p is not None:
         return p
-    mp = bulk_prices()
-    return mp.get(base)
+    # من آخر لقطة للـ poller بدل تنزيل /ticker/price كامل لعملة واحدة
+    fresh = last_bulk_ts and (time.time() - last_bulk_ts) <= BULK_SNAPSHOT_MAX_POLLS * POLL_SEC
+    p = bulk_snapshot.get(base) if fresh else None
+    with _fc_lock:
+        if not fresh: cache_stats["bulk:stale"] += 1
+        else:         cache_stats["bulk:hit" if p is not None else "bulk:miss"] += 1
+    return p
 
 # ========= إدارة العتبات (تعلّم سريع) =========
-def load_params():
-    params = DEFAULT_PARAMS.copy()
+def load_strategy_state(strats, with_open=False):
+    """عتبات كل الاستراتيجيات (+ العملات المفتوحة لكلٍّ منها) بنداء Redis واحد (pipeline).
+    يرجع (params_list, open_list)؛ open_list قائمة مجموعات فارغة إذا with_open=False."""
+    fields = list(DEFAULT_PARAMS.keys())
+    per = 3 if with_open else 2
+    rows = [None] * len(strats)
     try:
-        if r.exists("fl:params"):
-            for k in DEFAULT_PARAMS.keys():
-                v = r.hget("fl:params", k)
-                if v is not None:
-                    params[k] = float(v)
+        pipe = r.pipeline(transaction=False)
+        for s in strats:
+            pipe.hmget(f"{s['ns']}params", fields)
+            pipe.lindex(f"{s['ns']}trades", 0)
+            if with_open:
+                pipe.smembers(open_key(s))
+        res = pipe.execute()
+        rows = [res[per*i:per*(i + 1)] for i in range(len(strats))]
     except Exception:
         pass
 
-    # وضع هجومي إذا بقالنا فترة طويلة بلا صفقات
-    if AGGRESSIVE:
-        try:
-            last_trade_ts = int(json.loads(r.lindex("fl:trades", 0) or '{"t":0}')["t"])
-        except Exception:
-            last_trade_ts = 0
-        idle_s = (time.time() - last_trade_ts) if last_trade_ts else 10**9
-        if idle_s > AGGR_IDLE_MIN * 60:
-            params["r20s_thr"]   = max(0.10, params["r20s_thr"] - 0.05)
-            params["r60s_thr"]   = max(0.30, params["r60s_thr"] - 0.08)
-            params["spread_max"] = min(0.80, params["spread_max"] + 0.10)
-            params["ob_imb_min"] = max(1.10, params["ob_imb_min"] - 0.10)
-            params["vol_z_min"]  = max(1.10, params["vol_z_min"] - 0.10)
-    return params
-
-def bump_param(k, delta, lo, hi):
-    try:
-        cur = float(r.hget("fl:params", k) or DEFAULT_PARAMS[k])
-        new = max(lo, min(hi, cur + delta))
-        r.hset("fl:params", k, new)
-        return new
-    except Exception:
-        return None
-
-def adapt_on_result(win: bool):
-    step = 0.04 if win else -0.04
-    bump_param("r20s_thr", step,      0.10, 0.80)
-    bump_param("r60s_thr", step*1.2,  0.30, 2.00)
-    bump_param("spread_max", -step*0.6, 0.12, 0.80)
-    bump_param("ob_imb_min", step*0.8, 1.10, 3.50)
-    bump_param("vol_z_min",  step*0.8, 1.10, 4.00)
+    out, opens = [], []
+    for s, row in zip(strats, rows):
+        params = s["defaults"].copy()
+        vals, last_raw = (row[0], row[1]) if row else ([None] * len(fields), None)
+        opens.append(set(row[2]) if (row and with_open) else set())
+        for k, v in zip(fields, vals):
+            if v is not None:
+                params[k] = float(v)
+
+        # وضع هجومي إذا بقالنا فترة طويلة بلا صفقات
+        if AGGRESSIVE:
+            try:
+                last_trade_ts = int(json.loads(last_raw or '{"t":0}')["t"])
+            except Exception:
+                last_trade_ts = 0
+            idle_s = (time.time() - last_trade_ts) if last_trade_ts else 10**9
+            if idle_s > AGGR_IDLE_MIN * 60:
+                params["r20s_thr"]   = max(0.10, params["r20s_thr"] - 0.05)
+                params["r60s_thr"]   = max(0.30, params["r60s_thr"] - 0.08)
+                params["spread_max"] = min(0.80, params["spread_max"] + 0.10)
+                params["ob_imb_min"] = max(1.10, params["ob_imb_min"] - 0.10)
+                params["vol_z_min"]  = max(1.10, params["vol_z_min"] - 0.10)
+        out.append(params)
+    return out, opens
+
+def load_params_many(strats):
+    return load_strategy_state(strats)[0]
+
+def load_params(strat=None):
+    return load_params_many([strat or LIVE])[0]
+
+# قواعد التكيّف بعد كل نتيجة: (المفتاح، مضاعف الخطوة، الحد الأدنى، الحد الأعلى)
+ADAPT_STEP  = 0.04
+ADAPT_RULES = (
+    ("r20s_thr",    1.0, 0.10, 0.80),
+    ("r60s_thr",    1.2, 0.30, 2.00),
+    ("spread_max", -0.6, 0.12, 0.80),
+    ("ob_imb_min",  0.8, 1.10, 3.50),
+    ("vol_z_min",   0.8, 1.10, 4.00),
+)
+
+def adapt_args(strat):
+    """ARGV لسكربت الإغلاق: خطوة ثم (k, mult, lo, hi, default) لكل عتبة."""
+    out = [ADAPT_STEP]
+    for k, mult, lo, hi in ADAPT_RULES:
+        out += [k, mult, lo, hi, strat["defaults"][k]]
+    return out
 
 # ========= اختيار قائمة المراقبة =========
 def selector_worker():
@@ -357,7 +481,7 @@ def selector_worker():
 
 # ========= عامل سحب الأسعار العام =========
 def poller():
-    global last_bulk_ts, consecutive_http_fail
+    global last_bulk_ts, bulk_snapshot, consecutive_http_fail
     while True:
         try:
             refresh_markets()
@@ -382,6 +506,7 @@ def poller():
                     dq.append((now, price))
                     redis_store_price(base, now, price)
 
+            bulk_snapshot = mp
             last_bulk_ts = now
 
         except Exception as e:
@@ -390,41 +515,147 @@ def poller():
         time.sleep(POLL_SEC)
 
 # ========= إدارة الصفقات الوهمية =========
-def active_key(base): return f"fl:active:{base}"
+def active_key(base, strat=None): return f"{(strat or LIVE)['ns']}active:{base}"
+
+# مجموعة العملات المفتوحة لكل استراتيجية (تُحدَّث داخل سكربتات Lua) بدل SCAN على كل المفاتيح
+def open_key(strat=None): return f"{(strat or LIVE)['ns']}open"
 
-def compute_dynamic_timeout():
+def backfill_open_sets():
+    """مرة واحدة عند الإقلاع: صفقات فُتحت قبل وجود مجموعات open."""
     try:
-        wins = []
-        for raw in r.lrange("fl:trades", 0, 49):
-            x = json.loads(raw)
-            if x.get("win") and x.get("dur_s"):
-                wins.append(x["dur_s"])
-        if not wins: return VBUY_TIMEOUT_BASE
-        avg = sum(wins)/len(wins)
-        return VBUY_TIMEOUT_ALT if avg > 240 else VBUY_TIMEOUT_BASE
-    except Exception:
-        return VBUY_TIMEOUT_BASE
+        for strat in STRATEGIES:
+            prefix = active_key("", strat)
+            bases = [k[len(prefix):] for k in r.scan_iter(f"{prefix}*", count=1000)]
+            if bases:
+                r.sadd(open_key(strat), *bases)
+    except Exception as e:
+        print(f"[OPEN][ERR] {type(e).__name__}: {e}")
 
-def launch_virtual_buy(base, entry_price, feats):
-    key = active_key(base)
-    if r.exists(key):  # لا نكرر على نفس العملة
-        return False
-    timeout_sec = compute_dynamic_timeout()
+def notify(strat, text):
+    """الاستراتيجية الحية ترسل تلغرام؛ استراتيجيات الظل تكتب في السجل فقط."""
+    if strat is LIVE:
+        send_message(text)
+    else:
+        print(f"[SHADOW:{strat['name']}] {text}")
+
+TRADES_KEEP        = 500
+TIMEOUT_ALT_AVG_S  = 240   # متوسط زمن الربح الذي يفعّل المهلة الأطول
+ACTIVE_GRACE_SEC   = 900
+
+# ========= سكربتات Redis (Lua) — كل خطوة من دورة الصفقة = نداء ذرّي واحد =========
+# الإطلاق: فحص التكرار + حساب المهلة الديناميكية + HSET + EXPIRE
+# KEYS: active, trades, open | ARGV: grace, base_timeout, alt_timeout, alt_avg_s, ثم أزواج field/value
+LUA_LAUNCH = """
+if redis.call('EXISTS', KEYS[1]) == 1 then return 0 end
+local timeout = tonumber(ARGV[2])
+local sum, n = 0, 0
+for _, raw in ipairs(redis.call('LRANGE', KEYS[2], 0, 49)) do
+    local ok, x = pcall(cjson.decode, raw)
+    if ok and type(x) == 'table' and x.win == true and type(x.dur_s) == 'number' and x.dur_s ~= 0 then
+        sum = sum + x.dur_s; n = n + 1
+    end
+end
+if n > 0 and (sum / n) > tonumber(ARGV[4]) then timeout = tonumber(ARGV[3]) end
+redis.call('HSET', KEYS[1], 'timeout_sec', timeout, unpack(ARGV, 5))
+redis.call('EXPIRE', KEYS[1], timeout + tonumber(ARGV[1]))
+redis.call('SADD', KEYS[3], KEYS[1]:match('([^:]+)$'))
+return timeout
+"""
+
+# التحديث أثناء المراقبة: قراءة الحقول + تحديث min/max pnl
+# KEYS: active, open | ARGV: price, default_timeout
+# يرجع {entry_price, entry_ts, timeout_sec, pnl} أو -1 إذا كانت الصفقة تالفة/منتهية (تُحذف من open)
+LUA_TICK = """
+local h = redis.call('HMGET', KEYS[1], 'entry_price', 'entry_ts', 'timeout_sec', 'min_pnl', 'max_pnl')
+local entry = tonumber(h[1]) or 0
+local ets   = tonumber(h[2]) or 0
+if entry == 0 or ets == 0 then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], KEYS[1]:match('([^:]+)$'))
+    return -1
+end
+local timeout = tonumber(h[3]) or tonumber(ARGV[2])
+local mn, mx  = tonumber(h[4]) or 0, tonumber(h[5]) or 0
+local pnl = (tonumber(ARGV[1]) - entry) / entry * 100
+if mn == 0 and mx == 0 then mn, mx = pnl, pnl
+else mn, mx = math.min(mn, pnl), math.max(mx, pnl) end
+redis.call('HSET', KEYS[1], 'min_pnl', tostring(mn), 'max_pnl', tostring(mx))
+return {tostring(entry), ets, timeout, tostring(pnl)}
+"""
+
+# الإغلاق: قراءة + حذف + سجل الصفقات + إحصاءات العملة + تكيّف العتبات
+# KEYS: active, trades, coin_stats, params, open
+# ARGV: exit_price, now, reason, win(1/0), trades_keep, step, ثم (k, mult, lo, hi, default)*
+# يرجع JSON {rec, recent} أو nil إذا أُغلقت الصفقة من عملية أخرى
+LUA_CLOSE = """
+redis.call('SREM', KEYS[5], KEYS[1]:match('([^:]+)$'))
+if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+local h = redis.call('HMGET', KEYS[1], 'entry_price', 'entry_ts', 'min_pnl', 'max_pnl')
+redis.call('DEL', KEYS[1])
+local function r3(x) return tonumber(string.format('%.3f', x)) end
+local entry = tonumber(h[1]) or 0
+local ets   = tonumber(h[2]) or 0
+local now   = tonumber(ARGV[2])
+local win   = ARGV[4] == '1'
+local pnl   = 0
+if entry ~= 0 then pnl = (tonumber(ARGV[1]) - entry) / entry * 100 end
+local dur = cjson.null
+if ets ~= 0 then dur = now - ets end
+local rec = {
+    t = now, base = KEYS[1]:match('([^:]+)$'), pnl_pct = r3(pnl), dur_s = dur,
+    reason = ARGV[3], win = win,
+    min_pnl = r3(tonumber(h[3]) or 0), max_pnl = r3(tonumber(h[4]) or 0)
+}
+redis.call('LPUSH', KEYS[2], cjson.encode(rec))
+redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[5]) - 1)
+
+if win then redis.call('HINCRBY', KEYS[3], 'wins', 1)
+else        redis.call('HINCRBY', KEYS[3], 'losses', 1) end
+redis.call('HSET', KEYS[3], 'last_seen', now)
+if win and dur ~= cjson.null and dur ~= 0 then
+    local old = tonumber(redis.call('HGET', KEYS[3], 'avg_time_to_2'))
+    local new = dur
+    if old then new = 0.7 * old + 0.3 * dur end
+    redis.call('HSET', KEYS[3], 'avg_time_to_2', tostring(new))
+end
+
+local step = tonumber(ARGV[6])
+if not win then step = -step end
+for i = 7, #ARGV, 5 do
+    local k = ARGV[i]
+    local cur = tonumber(redis.call('HGET', KEYS[4], k)) or tonumber(ARGV[i + 4])
+    local new = cur + step * tonumber(ARGV[i + 1])
+    new = math.max(tonumber(ARGV[i + 2]), math.min(tonumber(ARGV[i + 3]), new))
+    redis.call('HSET', KEYS[4], k, tostring(new))
+end
+
+return cjson.encode({rec = rec, recent = redis.call('LRANGE', KEYS[2], 0, 9)})
+"""
+
+# register_script => EVALSHA مع تحميل تلقائي عند NOSCRIPT
+launch_script = r.register_script(LUA_LAUNCH)
+tick_script   = r.register_script(LUA_TICK)
+close_script  = r.register_script(LUA_CLOSE)
+
+def launch_virtual_buy(base, entry_price, feats, strat=None):
+    strat = strat or LIVE
     try:
-        r.hset(key, mapping={
-            "base": base,
-            "entry_price": entry_price,
-            "entry_ts": int(time.time()),
-            "timeout_sec": timeout_sec,
-            "min_pnl": 0.0,
-            "max_pnl": 0.0,
-            "feats": json.dumps(feats)
-        })
-        r.expire(key, timeout_sec + 900)
+        timeout_sec = int(launch_script(
+            keys=[active_key(base, strat), f"{strat['ns']}trades", open_key(strat)],
+            args=[ACTIVE_GRACE_SEC, VBUY_TIMEOUT_BASE, VBUY_TIMEOUT_ALT, TIMEOUT_ALT_AVG_S,
+                  "base", base,
+                  "entry_price", entry_price,
+                  "entry_ts", int(time.time()),
+                  "min_pnl", 0.0,
+                  "max_pnl", 0.0,
+                  "feats", json.dumps(feats)]
+        ))
     except Exception as e:
         print(f"[VBUY][ERR] {type(e).__name__}: {e}")
         return False
-    send_message(
+    if not timeout_sec:  # لا نكرر على نفس العملة
+        return False
+    notify(strat,
         f"🤖 شراء وهمي {base} @ {entry_price:.8f} | "
         f"r20s={feats.get('r20s') and round(feats['r20s'],3)} "
         f"r60s={feats.get('r60s') and round(feats['r60s'],3)} "
@@ -435,63 +666,66 @@ def launch_virtual_buy(base, entry_price, feats):
     )
     return True
 
-def log_and_adapt(base, entry_price, exit_price, reason, win_flag, dur_s, min_pnl, max_pnl):
-    pnl_pct = (exit_price - entry_price)/entry_price*100.0 if entry_price else 0.0
-    rec = {
-        "t": int(time.time()), "base": base, "pnl_pct": round(pnl_pct, 3),
-        "dur_s": int(dur_s) if dur_s is not None else None,
-        "reason": reason, "win": bool(win_flag),
-        "min_pnl": round(min_pnl,3), "max_pnl": round(max_pnl,3)
-    }
-    try:
-        r.lpush("fl:trades", json.dumps(rec))
-        r.ltrim("fl:trades", 0, 499)
-        hk = f"fl:coin:{base}:stats"
-        if win_flag: r.hincrby(hk, "wins", 1)
-        else:        r.hincrby(hk, "losses", 1)
-        r.hset(hk, "last_seen", int(time.time()))
-        if win_flag and dur_s:
-            old = r.hget(hk, "avg_time_to_2")
-            new = (0.7*float(old) + 0.3*dur_s) if old else float(dur_s)
-            r.hset(hk, "avg_time_to_2", new)
-    except Exception as e:
-        print(f"[LOG][ERR] {type(e).__name__}: {e}")
-
-    adapt_on_result(win_flag)
+def tick_virtual_trade(base, price, strat=None):
+    """(entry_price, entry_ts, timeout_sec, pnl) أو None إذا كانت الصفقة تالفة/منتهية."""
+    res = tick_script(keys=[active_key(base, strat), open_key(strat)], args=[price, VBUY_TIMEOUT_BASE])
+    if not isinstance(res, list):
+        return None
+    return float(res[0]), int(res[1]), int(res[2]), float(res[3])
 
+def report_result(rec, recent, strat=None):
+    strat = strat or LIVE
+    win_flag = rec.get("win"); dur_s = rec.get("dur_s")
     emoji = "✅" if win_flag else "❌"
-    send_message(
-        f"{emoji} {base} {('ربح' if win_flag else 'خسر')} {pnl_pct:+.2f}% خلال {dur_s or '?'}s "
-        f"| سبب: {reason} | min={min_pnl:+.2f}% max={max_pnl:+.2f}%"
+    notify(strat,
+        f"{emoji} {rec['base']} {('ربح' if win_flag else 'خسر')} {rec['pnl_pct']:+.2f}% خلال {dur_s or '?'}s "
+        f"| سبب: {rec['reason']} | min={rec['min_pnl']:+.2f}% max={rec['max_pnl']:+.2f}%"
     )
 
     try:
-        items = [json.loads(x) for x in r.lrange("fl:trades", 0, 9)]
+        items = [json.loads(x) for x in recent]
         if items:
             wins = sum(1 for x in items if x.get("win"))
             losses = len(items) - wins
             durs = [x["dur_s"] for x in items if x.get("win") and x.get("dur_s")]
             avg_dur_win = int(sum(durs)/len(durs)) if durs else None
-            send_message(f"📊 ملخص (آخر 10): {wins} ✅ / {losses} ❌"
+            notify(strat, f"📊 ملخص (آخر 10): {wins} ✅ / {losses} ❌"
                          + (f" | ⏱ متوسط بلوغ +{TP_PCT:.1f}% ≈ {avg_dur_win}s" if avg_dur_win else ""))
     except Exception:
         pass
 
-def close_virtual_trade(base, exit_price, reason, win_flag):
-    key = active_key(base)
-    if not r.exists(key): return
-    entry_price = float(r.hget(key, "entry_price") or 0)
-    entry_ts    = int(r.hget(key, "entry_ts") or 0)
-    min_pnl     = float(r.hget(key, "min_pnl") or 0.0)
-    max_pnl     = float(r.hget(key, "max_pnl") or 0.0)
-    dur_s       = int(time.time()) - entry_ts if entry_ts else None
-    log_and_adapt(base, entry_price, exit_price, reason, win_flag, dur_s, min_pnl, max_pnl)
-    try: r.delete(key)
-    except Exception: pass
+def close_virtual_trade(base, exit_price, reason, win_flag, strat=None):
+    strat = strat or LIVE; ns = strat["ns"]
+    try:
+        raw = close_script(
+            keys=[active_key(base, strat), f"{ns}trades", f"{ns}coin:{base}:stats", f"{ns}params", open_key(strat)],
+            args=[exit_price, int(time.time()), reason, 1 if win_flag else 0, TRADES_KEEP] + adapt_args(strat)
+        )
+    except Exception as e:
+        print(f"[LOG][ERR] {type(e).__name__}: {e}")
+        return
+    if not raw: return  # أُغلقت مسبقًا
+    res = json.loads(raw)
+    report_result(res["rec"], res["recent"], strat)
 
 # ========= كاشف “تهيؤ للقفزة” =========
-def readiness_and_maybe_launch(base, debug=False):
-    params = load_params()
+def score_strategies(r20s, r60s, ob, volz, params_list):
+    """تقييم كل الاستراتيجيات دفعة واحدة على نفس متجه الميزات: عمود لكل شرط، عنصر لكل استراتيجية."""
+    spr, imb = ob.get("spread_pct"), ob.get("ob_imb")
+    c20  = [r20s is not None and r20s >= p["r20s_thr"]   for p in params_list]
+    c60  = [r60s is not None and r60s >= p["r60s_thr"]   for p in params_list]
+    cspr = [spr  is not None and spr  <= p["spread_max"] for p in params_list]
+    cimb = [imb  is not None and imb  >= p["ob_imb_min"] for p in params_list]
+    # FIX-4: اعتبر volZ اختياري؛ لا يمنع الإطلاق إذا باقي الشروط كافية
+    cvz  = [volz is not None and volz >= p["vol_z_min"]  for p in params_list]
+    scores   = [sum(row) for row in zip(c20, c60, cspr, cimb, cvz)]
+    momentum = [a or b for a, b in zip(c20, c60)]
+    return scores, momentum, (c20, c60, cspr, cimb, cvz)
+
+def readiness_and_maybe_launch(base, debug=False, params_list=None):
+    # الميزات تُحسب مرة واحدة لكل عملة؛ الاستراتيجيات الإضافية تكلّف حسابًا فقط
+    if params_list is None:
+        params_list = load_params_many(STRATEGIES)
     r20s = redis_pct_change_seconds(base, 20)   # ~ 20s momentum
     r60s = redis_pct_change_seconds(base, 60)   # ~ 60s momentum
     ob   = get_orderbook_and_spread(base) or {}
@@ -501,51 +735,35 @@ def readiness_and_maybe_launch(base, debug=False):
         if debug: send_message(f"ℹ️ {base}: price=None")
         return
 
-    score = 0; momentum_ok = False; reasons = []
-    if r20s is not None and r20s >= params["r20s_thr"]:
-        score += 1; momentum_ok = True
-    else:
-        reasons.append(f"r20<{params['r20s_thr']:.2f}%")
-
-    if r60s is not None and r60s >= params["r60s_thr"]:
-        score += 1; momentum_ok = True
-    else:
-        reasons.append(f"r60<{params['r60s_thr']:.2f}%")
-
-    if ob.get("spread_pct") is not None and ob["spread_pct"] <= params["spread_max"]:
-        score += 1
-    else:
-        reasons.append("spread")
-
-    if ob.get("ob_imb") is not None and ob["ob_imb"] >= params["ob_imb_min"]:
-        score += 1
-    else:
-        reasons.append("imb")
-
-    # FIX-4: اعتبر volZ اختياري؛ لا يمنع الإطلاق إذا باقي الشروط كافية
-    if volz is not None and volz >= params["vol_z_min"]:
-        score += 1
-    else:
-        reasons.append("volZ")
-
-    needed = 1 + REQUIRED_EXTRA_SIG  # 1 للزخم + عدد الشروط الإضافية
-    if momentum_ok and score >= needed:
-        feats = {
-            "r20s": r20s, "r60s": r60s,
-            "spread": ob.get("spread_pct"), "ob_imb": ob.get("ob_imb"),
-            "vol_z": volz, "score": score
-        }
-        launch_virtual_buy(base, price, feats)
-    elif debug:
-        send_message(f"🧪 {base}: no-go | score={score}/{needed} | "
+    scores, momentum, cols = score_strategies(r20s, r60s, ob, volz, params_list)
+    for i, strat in enumerate(STRATEGIES):
+        needed = 1 + strat["required_extra"]  # 1 للزخم + عدد الشروط الإضافية
+        if momentum[i] and scores[i] >= needed:
+            feats = {
+                "r20s": r20s, "r60s": r60s,
+                "spread": ob.get("spread_pct"), "ob_imb": ob.get("ob_imb"),
+                "vol_z": volz, "score": scores[i]
+            }
+            launch_virtual_buy(base, price, feats, strat)
+
+    needed = 1 + LIVE["required_extra"]
+    if debug and not (momentum[0] and scores[0] >= needed):
+        params = params_list[0]
+        labels = (f"r20<{params['r20s_thr']:.2f}%", f"r60<{params['r60s_thr']:.2f}%", "spread", "imb", "volZ")
+        reasons = [lbl for lbl, col in zip(labels, cols) if not col[0]]
+        shadow = " ".join(f"{s['name']}={scores[i]}/{1 + s['required_extra']}"
+                          for i, s in enumerate(STRATEGIES) if i > 0)
+        send_message(f"🧪 {base}: no-go | score={scores[0]}/{needed} | "
                      f"r20={r20s and round(r20s,3)} r60={r60s and round(r60s,3)} "
                      f"spr={ob.get('spread_pct') and round(ob['spread_pct'],3)} "
                      f"imb={ob.get('ob_imb') and round(ob['ob_imb'],2)} volZ={volz and round(volz,2)} | "
-                     f"miss={','.join(reasons[:3])}")
+                     f"miss={','.join(reasons[:3])}"
+                     + (f" | shadow: {shadow}" if shadow else ""))
 
 # ========= عامل التعلم/المراقبة =========
 def learner_worker():
     last_tick = 0
+    backfill_open_sets()
     while True:
         try:
             if not learn_running.is_set():
@@ -557,34 +775,28 @@ def learner_worker():
             last_tick = now
 
             wl = list(watch_list)
+            params_list, open_list = load_strategy_state(STRATEGIES, with_open=True)
             for b in wl:
-                readiness_and_maybe_launch(b)
-
-            for key in r.scan_iter("fl:active:*", count=200):
-                base = key.split(":")[-1]
-                entry_price = float(r.hget(key, "entry_price") or 0)
-                entry_ts    = int(r.hget(key, "entry_ts") or 0)
-                timeout_sec = int(r.hget(key, "timeout_sec") or VBUY_TIMEOUT_BASE)
-                min_pnl     = float(r.hget(key, "min_pnl") or 0.0)
-                max_pnl     = float(r.hget(key, "max_pnl") or 0.0)
-                if not entry_price or not entry_ts:
-                    r.delete(key); continue
-
-                price = get_last_price(base)
-                if price is None: continue
-
-                pnl = (price - entry_price)/entry_price*100.0
-
-                new_min = pnl if (min_pnl == 0.0 and max_pnl == 0.0) else min(min_pnl, pnl)
-                new_max = pnl if (min_pnl == 0.0 and max_pnl == 0.0) else max(max_pnl, pnl)
-                r.hset(key, mapping={"min_pnl": new_min, "max_pnl": new_max})
-
-                if pnl <= FAIL_PCT:
-                    close_virtual_trade(base, price, f"FAIL {FAIL_PCT:.1f}% touch", win_flag=False); continue
-                if pnl >= TP_PCT:
-                    close_virtual_trade(base, price, f"TP +{TP_PCT:.1f}%", win_flag=True); continue
-                if (int(time.time()) - entry_ts) >= timeout_sec:
-                    close_virtual_trade(base, price, "timeout", win_flag=False); continue
+                readiness_and_maybe_launch(b, params_list=params_list)
+
+            tick_prices = {}  # سعر واحد لكل عملة في التيك مهما كان عدد الاستراتيجيات
+            for strat, bases in zip(STRATEGIES, open_list):
+                for base in bases:
+                    if base not in tick_prices:
+                        tick_prices[base] = get_last_price(base)
+                    price = tick_prices[base]
+                    if price is None: continue
+
+                    row = tick_virtual_trade(base, price, strat)
+                    if row is None: continue
+                    entry_price, entry_ts, timeout_sec, pnl = row
+
+                    if pnl <= FAIL_PCT:
+                        close_virtual_trade(base, price, f"FAIL {FAIL_PCT:.1f}% touch", win_flag=False, strat=strat); continue
+                    if pnl >= TP_PCT:
+                        close_virtual_trade(base, price, f"TP +{TP_PCT:.1f}%", win_flag=True, strat=strat); continue
+                    if (int(time.time()) - entry_ts) >= timeout_sec:
+                        close_virtual_trade(base, price, "timeout", win_flag=False, strat=strat); continue
 
         except Exception as e:
             print(f"[LEARN][ERR] {type(e).__name__}: {e}")
@@ -593,7 +805,7 @@ def learner_worker():
 # ========= مسح مفاتيح التعلم فقط =========
 def clear_learn_keys():
     total = 0
-    for pat in ["fl:params", "fl:active:*", "fl:trades", "fl:coin:*", f"fl:{QUOTE}:p:*"]:
+    for pat in ["fl:params", "fl:active:*", "fl:open", "fl:trades", "fl:coin:*", "fl:s:*", f"fl:{QUOTE}:p:*"]:
         for k in r.scan_iter(pat, count=1000):
             try: r.unlink(k); total += 1
             except Exception:
@@ -601,6 +813,25 @@ def clear_learn_keys():
                 except Exception: pass
     return total
 
+# ========= ملخص الاستراتيجيات (حيّة + ظل) =========
+def strategies_summary(last_n=50):
+    params_list, open_list = load_strategy_state(STRATEGIES, with_open=True)
+    pipe = r.pipeline(transaction=False)
+    for strat in STRATEGIES:
+        pipe.lrange(f"{strat['ns']}trades", 0, last_n - 1)
+    out = []
+    for strat, params, bases, rows in zip(STRATEGIES, params_list, open_list, pipe.execute()):
+        items = [json.loads(x) for x in rows]
+        wins = sum(1 for x in items if x.get("win"))
+        out.append({
+            "name": strat["name"], "params": params,
+            "required_extra": strat["required_extra"],
+            "active": len(bases),
+            "trades": len(items), "wins": wins, "losses": len(items) - wins,
+            "avg_pnl": round(sum(x.get("pnl_pct", 0.0) for x in items)/len(items), 3) if items else None
+        })
+    return out
+
 # ========= Web =========
 @app.get("/")
 def health():
@@ -612,7 +843,7 @@ def stats_api():
         wl = list(watch_list)
     p = load_params()
     age = (time.time()-last_bulk_ts) if last_bulk_ts else None
-    active_cnt = len(list(r.scan_iter("fl:active:*", count=200)))
+    active_cnt = r.scard(open_key(LIVE))
     return jsonify({
         "watch_list": wl,
         "params": p,
@@ -620,7 +851,9 @@ def stats_api():
         "active_virtual": active_cnt,
         "tick_sec": TICK_LEARN_SEC,
         "tp_pct": TP_PCT, "fail_pct": FAIL_PCT,
-        "required_extra": REQUIRED_EXTRA_SIG
+        "required_extra": REQUIRED_EXTRA_SIG,
+        "strategies": strategies_summary() if len(STRATEGIES) > 1 else None,
+        "feature_cache": cache_stats_snapshot()
     }), 200
 
 # ========= تلغرام Webhook =========
@@ -681,7 +914,7 @@ def telegram_webhook():
             with lock: wl = list(watch_list)
             p = load_params()
             age = (time.time()-last_bulk_ts) if last_bulk_ts else None
-            active_cnt = len(list(r.scan_iter("fl:active:*", count=200)))
+            active_cnt = r.scard(open_key(LIVE))
             lines = [
                 "📟 Stats:",
                 f"- watch_list: {wl if wl else '[]'}",
@@ -689,20 +922,36 @@ def telegram_webhook():
                 f"- last_bulk_age: {int(age) if age is not None else 'NA'}s",
                 f"- r20s_thr={p['r20s_thr']:.3f}% | r60s_thr={p['r60s_thr']:.3f}% | spread_max={p['spread_max']:.3f}%",
                 f"- ob_imb_min={p['ob_imb_min']:.2f} | vol_z_min={p['vol_z_min']:.2f} | required_extra={REQUIRED_EXTRA_SIG}",
+                "- cache: " + (" ".join(f"{k}={v}" for k, v in sorted(cache_stats_snapshot().items())) or "-"),
             ]
             send_message("\n".join(lines))
         except Exception as e:
             send_message(f"ERR /stats: {type(e).__name__}: {e}")
         return "ok", 200
 
+    if text in {"/shadow", "ظل", "الاستراتيجيات"}:
+        try:
+            lines = ["👥 Strategies (آخر 50):"]
+            for st in strategies_summary():
+                p = st["params"]
+                lines.append(
+                    f"- {st['name']}: {st['wins']} ✅ / {st['losses']} ❌ | avg={st['avg_pnl'] if st['avg_pnl'] is not None else 'NA'}% "
+                    f"| active={st['active']} | spr≤{p['spread_max']:.2f} r20≥{p['r20s_thr']:.2f} extra={st['required_extra']}"
+                )
+            send_message("\n".join(lines))
+        except Exception as e:
+            send_message(f"ERR /shadow: {type(e).__name__}: {e}")
+        return "ok", 200
+
     # FIX-5: أمر تشخيص فوري يطبع أسباب الرفض
     if text.startswith("/poke"):
         wl = list(watch_list)
         if not wl:
             send_message("🧪 لا توجد قائمة مراقبة حالياً.")
             return "ok", 200
+        params_list = load_params_many(STRATEGIES)
         for b in wl:
-            readiness_and_maybe_launch(b, debug=True)
+            readiness_and_maybe_launch(b, debug=True, params_list=params_list)
         return "ok", 200
 
     return "ok", 200
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Bitvavo Stand-in — خادم محلي يحاكي نقاط Bitvavo التي يستخدمها main.py
+(/markets, /ticker/price, /book, /candles) بأسواق اصطناعية (random walk)
+مع قفزات قابلة للحقن، تأخير، أخطاء 5xx، وحد معدل (429).
+
+تشغيل:  SIM_MARKETS=1000 SIM_PORT=8765 python simulator.py
+ثم:     BITVAVO_URL=http://127.0.0.1:8765/v2 python -c "import main; main.app.run(port=8080)"
+
+ملاحظة: /candles يرجع الشموع من الأحدث إلى الأقدم مثل Bitvavo، وحجم القفزة (×4) على الشمعة
+الأحدث. main.fetch_vol_1m_vs_5m يقرأ resp.json()[-6:] أي أقدم 6 شموع من 1440، لذلك volZ أثناء
+القفزة يُحسب من شموع عمرها يوم ولا يختبر هذا المحاكي مسار volZ (مشكلة معروفة في main.py).
+الشموع حتمية لكل (SIM_SEED, السوق, الدقيقة).
+"""
+
+import os, time, math, random
+from collections import deque, defaultdict
+from threading import Lock
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+# ========= إعدادات =========
+SIM_MARKETS     = int(os.getenv("SIM_MARKETS", 200))
+SIM_QUOTE       = os.getenv("SIM_QUOTE", "EUR")
+SIM_SEED        = int(os.getenv("SIM_SEED", 42))
+SIM_VOL_PCT     = float(os.getenv("SIM_VOL_PCT", 0.05))     # انحراف السعر % لكل ثانية
+SIM_LATENCY_MS  = float(os.getenv("SIM_LATENCY_MS", 0))     # تأخير ثابت لكل طلب
+SIM_JITTER_MS   = float(os.getenv("SIM_JITTER_MS", 0))      # تأخير عشوائي إضافي [0, jitter]
+SIM_ERROR_RATE  = float(os.getenv("SIM_ERROR_RATE", 0.0))   # نسبة ردود 500
+SIM_RATE_LIMIT  = float(os.getenv("SIM_RATE_LIMIT", 0))     # طلب/ثانية (0 = بلا حد) → 429
+SIM_PUMP_EVERY  = float(os.getenv("SIM_PUMP_EVERY", 0))     # قفزة تلقائية كل N ثانية (0 = معطّل)
+SIM_PUMP_PCT    = float(os.getenv("SIM_PUMP_PCT", 4.0))     # حجم القفزة %
+SIM_PUMP_SECS   = float(os.getenv("SIM_PUMP_SECS", 60))     # مدتها
+BOOK_LEVELS     = 25
+
+API = "/v2"
+
+# ========= حالة =========
+lock = Lock()
+rng  = random.Random(SIM_SEED)
+
+markets = [f"S{i:04d}" for i in range(SIM_MARKETS)]
+prices  = {b: 10 ** rng.uniform(-3, 3) for b in markets}
+last_ts = time.time()
+pumps   = {}   # base -> (end_ts, pct_per_sec)
+last_auto_pump = time.time()
+
+counts     = defaultdict(int)        # endpoint -> عدد الطلبات
+status_cnt = defaultdict(int)        # 200/429/500
+ticker_ts  = deque(maxlen=2000)      # أوقات طلبات /ticker/price لقياس فترات الـ poll
+bucket     = {"tokens": SIM_RATE_LIMIT, "ts": time.time()}
+
+# ========= محرك الأسعار =========
+def start_pump(base, pct, secs):
+    with lock:
+        pumps[base] = (time.time() + secs, pct / max(1.0, secs))
+    print(f"[SIM][PUMP] {base} +{pct:.2f}% over {secs:.0f}s")
+
+def advance(now):
+    """تحريك كل الأسعار من آخر تحديث حتى الآن (يُستدعى تحت القفل)."""
+    global last_ts, last_auto_pump
+    dt = now - last_ts
+    if dt <= 0: return
+    last_ts = now
+    sigma = SIM_VOL_PCT / 100.0 * math.sqrt(dt)
+    for b in markets:
+        drift = 0.0
+        pm = pumps.get(b)
+        if pm:
+            end_ts, rate = pm
+            if now >= end_ts:
+                pumps.pop(b, None)
+            else:
+                drift = rate / 100.0 * dt
+        prices[b] *= math.exp(drift + rng.gauss(0.0, sigma))
+    if SIM_PUMP_EVERY and (now - last_auto_pump) >= SIM_PUMP_EVERY:
+        last_auto_pump = now
+        b = rng.choice(markets)
+        pumps[b] = (now + SIM_PUMP_SECS, SIM_PUMP_PCT / max(1.0, SIM_PUMP_SECS))
+        print(f"[SIM][PUMP] auto {b} +{SIM_PUMP_PCT:.2f}% over {SIM_PUMP_SECS:.0f}s")
+
+def fmt(p): return f"{p:.8g}"
+
+def base_of(market):
+    mk = market or ""
+    if not mk.endswith(f"-{SIM_QUOTE}"): return None
+    b = mk.split("-")[0]
+    return b if b in prices else None
+
+# ========= أعطال مصطنعة =========
+@app.before_request
+def inject_faults():
+    if not request.path.startswith(API): return None
+    with lock:
+        counts[request.path[len(API):]] += 1
+        if request.path == f"{API}/ticker/price":
+            ticker_ts.append(time.time())
+
+    if SIM_LATENCY_MS or SIM_JITTER_MS:
+        time.sleep((SIM_LATENCY_MS + rng.uniform(0, SIM_JITTER_MS)) / 1000.0)
+
+    if SIM_RATE_LIMIT:
+        with lock:
+            now = time.time()
+            bucket["tokens"] = min(SIM_RATE_LIMIT, bucket["tokens"] + (now - bucket["ts"]) * SIM_RATE_LIMIT)
+            bucket["ts"] = now
+            limited = bucket["tokens"] < 1.0
+            if not limited:
+                bucket["tokens"] -= 1.0
+            else:
+                status_cnt[429] += 1
+        if limited:
+            return jsonify({"errorCode": 110, "error": "Rate limit exceeded."}), 429
+
+    if SIM_ERROR_RATE and rng.random() < SIM_ERROR_RATE:
+        with lock:
+            status_cnt[500] += 1
+        return jsonify({"errorCode": 101, "error": "Unknown error."}), 500
+
+    with lock:
+        status_cnt[200] += 1
+    return None
+
+# ========= نقاط Bitvavo =========
+@app.get(f"{API}/markets")
+def api_markets():
+    return jsonify([{"market": f"{b}-{SIM_QUOTE}", "base": b, "quote": SIM_QUOTE, "status": "trading"}
+                    for b in markets])
+
+@app.get(f"{API}/ticker/price")
+def api_ticker_price():
+    with lock:
+        advance(time.time())
+        rows = [{"market": f"{b}-{SIM_QUOTE}", "price": fmt(p)} for b, p in prices.items()]
+    return jsonify(rows)
+
+@app.get(f"{API}/book")
+def api_book():
+    b = base_of(request.args.get("market"))
+    if not b:
+        return jsonify({"errorCode": 205, "error": "market parameter is invalid."}), 400
+    depth = int(request.args.get("depth", BOOK_LEVELS))
+    with lock:
+        advance(time.time())
+        mid = prices[b]; pumping = b in pumps
+    # أثناء القفزة: سبريد أضيق وطلب شراء أثقل
+    half = mid * (0.0005 if pumping else rng.uniform(0.0005, 0.004))
+    bid_w = 2.5 if pumping else 1.0
+    bids, asks = [], []
+    for i in range(min(depth, BOOK_LEVELS)):
+        step = mid * 0.0005 * i
+        bids.append([fmt(mid - half - step), fmt(rng.uniform(50, 500) * bid_w / mid)])
+        asks.append([fmt(mid + half + step), fmt(rng.uniform(50, 500) / mid)])
+    return jsonify({"market": f"{b}-{SIM_QUOTE}", "nonce": int(time.time() * 1000),
+                    "bids": bids, "asks": asks})
+
+@app.get(f"{API}/candles")
+def api_candles():
+    b = base_of(request.args.get("market"))
+    if not b:
+        return jsonify({"errorCode": 205, "error": "market parameter is invalid."}), 400
+    if request.args.get("interval") != "1m":
+        return jsonify({"errorCode": 205, "error": "interval parameter is invalid."}), 400
+    limit = max(1, min(1440, int(request.args.get("limit", 1440))))
+    with lock:
+        advance(time.time())
+        close = prices[b]; pumping = b in pumps
+    # Bitvavo يرجع الشموع من الأحدث إلى الأقدم
+    minute = int(time.time() // 60) * 60 * 1000
+    crng = random.Random(f"{SIM_SEED}:{b}:{minute}")   # hash() عشوائي لكل عملية
+    rows, p = [], close
+    for i in range(limit):
+        o = p * math.exp(crng.gauss(0.0, SIM_VOL_PCT / 100.0 * 8))
+        hi, lo = max(o, p) * 1.001, min(o, p) * 0.999
+        vol = crng.uniform(100, 1000) / p
+        if pumping and i == 0:
+            vol *= 4.0
+        rows.append([minute - i * 60_000, fmt(o), fmt(hi), fmt(lo), fmt(p), fmt(vol)])
+        p = o
+    return jsonify(rows)
+
+# ========= تحكم وإحصاءات المحاكي =========
+@app.route("/sim/pump", methods=["GET", "POST"])
+def sim_pump():
+    b = request.args.get("base") or rng.choice(markets)
+    if b not in prices:
+        return jsonify({"error": "unknown base"}), 404
+    start_pump(b, float(request.args.get("pct", SIM_PUMP_PCT)), float(request.args.get("secs", SIM_PUMP_SECS)))
+    return jsonify({"base": b}), 200
+
+def pctl(xs, q):
+    if not xs: return None
+    xs = sorted(xs)
+    return xs[int(round(q * (len(xs) - 1)))]
+
+@app.get("/sim/stats")
+def sim_stats():
+    with lock:
+        ts = list(ticker_ts)
+        requests_cnt = dict(counts)
+        status = {str(k): v for k, v in status_cnt.items()}
+    gaps = [b - a for a, b in zip(ts, ts[1:])][-200:]
+    return jsonify({
+        "markets": len(markets),
+        "requests": requests_cnt,
+        "status": status,
+        "active_pumps": len(pumps),
+        "ticker_gap_p50": pctl(gaps, 0.50),
+        "ticker_gap_p95": pctl(gaps, 0.95),
+        "ticker_gap_max": max(gaps) if gaps else None,
+    }), 200
+
+@app.get("/")
+def health():
+    return f"Bitvavo stand-in (markets={len(markets)}) ✅", 200
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=int(os.getenv("SIM_PORT", 8765)), threaded=True)